@@ -0,0 +1,428 @@
+# annotation_server_en.py
+"""Local HTTP annotation service.
+
+Keeps YOLO models resident and coalesces concurrent requests into micro-batches.
+
+Endpoints:
+    GET  /health                  -> {"status": "ok"}
+    GET  /metrics                 -> queue depth, in-flight requests, batch statistics
+    GET  /classes?model=x.pt      -> class names of a model
+    POST /annotate                -> YOLO label lines (format=yolo) or JSON (format=json)
+
+/annotate accepts either a JSON body {"path": ..., "model": ..., "conf": ..., "classes": [...], "format": ...}
+or the raw image bytes as the body, with the options passed as query parameters
+(model, conf, classes=a,b, format).
+
+Start with: python annotation_server_en.py --port 8765
+"""
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import cv2
+import numpy as np
+from ultralytics import YOLO
+from auto_annotator_en import get_classes, build_class_mapping, extract_boxes, format_yolo_line
+
+class ModelRegistry:
+    """Loads each model once and keeps it resident together with its class list"""
+    def __init__(self, model_dir="models"):
+        self.model_dir = model_dir
+        self._models = {}
+        self._classes = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, name):
+        """Resolve a model name to an existing .pt file inside model_dir.
+
+        Absolute paths and names that escape model_dir are rejected: loading a .pt file
+        unpickles it, so clients may only choose among the models the server was given.
+        """
+        if not name:
+            raise ValueError("Missing 'model' parameter")
+        model_dir = os.path.realpath(self.model_dir)
+        path = os.path.realpath(os.path.join(model_dir, name))
+        if os.path.isabs(name) or os.path.commonpath([model_dir, path]) != model_dir or not path.endswith('.pt'):
+            raise ValueError(f"Model must be a .pt file name inside the model directory: {name}")
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Model file not found: {name}")
+        return path
+
+    def get_classes(self, model_path):
+        with self._lock:
+            if model_path not in self._classes:
+                self._classes[model_path] = get_classes(model_path)
+            return self._classes[model_path]
+
+    def get_model(self, model_path):
+        with self._lock:
+            if model_path not in self._models:
+                print(f"[DEBUG] Loading resident model: {model_path}")
+                self._models[model_path] = YOLO(model_path)
+            return self._models[model_path]
+
+    def loaded(self):
+        with self._lock:
+            return sorted(self._models)
+
+class _Job:
+    """One pending image, waiting for its micro-batch to run"""
+    def __init__(self, key, image):
+        self.key = key # (model_path, conf, selected_classes tuple or None)
+        self.image = image
+        self.enqueued = time.monotonic()
+        self.done = threading.Event()
+        self.cancelled = False # Set when the client stopped waiting; the job is then skipped
+        self.boxes = None
+        self.error = None
+
+class MicroBatcher:
+    """Coalesces concurrent requests with the same model/conf/classes into one inference call.
+
+    A batch is dispatched as soon as it holds max_batch images or its oldest image
+    has waited max_wait seconds, whichever comes first. All inference runs on the
+    single worker thread, so models are never called concurrently.
+    """
+    def __init__(self, registry, max_batch=8, max_wait=0.01, max_pending=256):
+        self.registry = registry
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._carry = deque() # Jobs pulled while filling a batch for another key
+        self._stop = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "requests_total": 0,
+            "rejected_total": 0,
+            "errors_total": 0,
+            "cancelled_total": 0,
+            "batches_total": 0,
+            "images_total": 0,
+            "max_batch_size": 0,
+            "wait_seconds_total": 0.0,
+            "inference_seconds_total": 0.0,
+        }
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, key, image):
+        """Queue an image; raises queue.Full when the pending queue is at capacity"""
+        job = _Job(key, image)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._bump("rejected_total")
+            raise
+        self._bump("requests_total")
+        return job
+
+    def queue_depth(self):
+        return self._queue.qsize() + len(self._carry)
+
+    def stop(self):
+        self._stop.set()
+
+    def _bump(self, name, amount=1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def _next_job(self, timeout):
+        """Return the oldest job that is not cancelled"""
+        while True:
+            job = self._carry.popleft() if self._carry else self._queue.get(timeout=timeout)
+            if not self._skip_cancelled(job):
+                return job
+
+    def _skip_cancelled(self, job):
+        if job.cancelled:
+            self._bump("cancelled_total")
+            job.done.set()
+        return job.cancelled
+
+    def _collect(self):
+        """Block for the first job, then fill its batch until full.
+
+        Until the first job's deadline the worker waits for more jobs; after it, jobs
+        that are already queued are still taken, so a backlog that built up during
+        the previous batch is dispatched in full batches.
+        """
+        first = self._next_job(timeout=0.5)
+        batch = [first]
+        for job in list(self._carry):
+            if len(batch) >= self.max_batch:
+                break
+            if job.key == first.key:
+                self._carry.remove(job)
+                if not self._skip_cancelled(job):
+                    batch.append(job)
+        deadline = first.enqueued + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if self._skip_cancelled(job):
+                continue
+            if job.key == first.key:
+                batch.append(job)
+            else:
+                self._carry.append(job)
+                if remaining <= 0:
+                    break # Past the deadline, don't move the whole backlog into _carry
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = self._collect()
+            except queue.Empty:
+                continue
+            self._process(batch)
+
+    def _process(self, batch):
+        batch = [job for job in batch if not self._skip_cancelled(job)]
+        if not batch:
+            return
+        model_path, conf, selected = batch[0].key
+        started = time.monotonic()
+        try:
+            all_class_names = self.registry.get_classes(model_path)
+            filtered = all_class_names if selected is None else [n for n in all_class_names if n in set(selected)]
+            old_id_to_new_id = build_class_mapping(all_class_names, filtered)
+            model = self.registry.get_model(model_path)
+            results = model([job.image for job in batch], conf=conf, classes=list(old_id_to_new_id), verbose=False)
+            for job, result in zip(batch, results):
+                job.boxes = extract_boxes(result, old_id_to_new_id)
+        except Exception as e:
+            print(f"[ERROR] Batch inference failed: {e}")
+            self._bump("errors_total", len(batch))
+            for job in batch:
+                job.error = str(e)
+        finished = time.monotonic()
+        with self._stats_lock:
+            self.stats["batches_total"] += 1
+            self.stats["images_total"] += len(batch)
+            self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+            self.stats["wait_seconds_total"] += sum(started - job.enqueued for job in batch)
+            self.stats["inference_seconds_total"] += finished - started
+        for job in batch:
+            job.done.set()
+
+    def snapshot(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        batches = stats["batches_total"]
+        images = stats["images_total"]
+        stats["avg_batch_size"] = images / batches if batches else 0.0
+        stats["avg_wait_ms"] = 1000 * stats["wait_seconds_total"] / images if images else 0.0
+        stats["avg_inference_ms"] = 1000 * stats["inference_seconds_total"] / batches if batches else 0.0
+        stats["queue_depth"] = self.queue_depth()
+        stats["max_pending"] = self._queue.maxsize
+        stats["max_batch"] = self.max_batch
+        stats["max_wait_ms"] = self.max_wait * 1000
+        return stats
+
+class AnnotationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, registry, batcher, max_concurrent=32, request_timeout=60.0):
+        super().__init__(address, AnnotationRequestHandler)
+        self.registry = registry
+        self.batcher = batcher
+        self.max_concurrent = max_concurrent
+        self.request_timeout = request_timeout
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.in_flight = 0
+        self.in_flight_lock = threading.Lock()
+
+    def metrics(self):
+        stats = self.batcher.snapshot()
+        with self.in_flight_lock:
+            stats["in_flight"] = self.in_flight
+        stats["max_concurrent"] = self.max_concurrent
+        stats["models_loaded"] = self.registry.loaded()
+        return stats
+
+class AnnotationRequestHandler(BaseHTTPRequestHandler):
+    server_version = "YoloAutoLabel/2.0"
+
+    def log_message(self, format, *args):
+        print(f"[TRACE] {self.address_string()} {format % args}")
+
+    def _send(self, status, body, content_type="application/json"):
+        if not isinstance(body, bytes):
+            if content_type == "application/json":
+                body = json.dumps(body, ensure_ascii=False)
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, msg):
+        self._send(status, {"error": msg})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif url.path == "/metrics":
+            self._send(200, self.server.metrics())
+        elif url.path == "/classes":
+            try:
+                model_path = self.server.registry.resolve(params.get("model"))
+                self._send(200, {"model": model_path, "classes": self.server.registry.get_classes(model_path)})
+            except (ValueError, FileNotFoundError) as e:
+                self._error(404, str(e))
+        else:
+            self._error(404, f"Unknown endpoint: {url.path}")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/annotate":
+            self._error(404, f"Unknown endpoint: {url.path}")
+            return
+        if not self.server.slots.acquire(blocking=False):
+            self._error(503, f"Too many concurrent requests (limit {self.server.max_concurrent})")
+            return
+        with self.server.in_flight_lock:
+            self.server.in_flight += 1
+        try:
+            self._annotate(url)
+        finally:
+            with self.server.in_flight_lock:
+                self.server.in_flight -= 1
+            self.server.slots.release()
+
+    def _read_request(self, url):
+        """Return (options, image) from a JSON body with a path, or from raw image bytes"""
+        # Keep blank values so that 'classes=' means no classes, like a JSON "classes": []
+        options = {k: v[-1] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        content_type = self.headers.get("Content-Type", "")
+
+        if content_type.startswith("application/json"):
+            payload = json.loads(body.decode("utf-8") or "{}")
+            if not isinstance(payload, dict):
+                raise ValueError("JSON body must be an object")
+            options.update(payload)
+            body = b""
+
+        classes = options.get("classes")
+        if isinstance(classes, str):
+            options["classes"] = [c for c in classes.split(",") if c]
+        elif classes is not None and not (isinstance(classes, list) and all(isinstance(c, str) for c in classes)):
+            raise ValueError("'classes' must be a list of class names or a comma-separated string")
+        if not isinstance(options.get("path", ""), str):
+            raise ValueError("'path' must be a string")
+
+        if body:
+            image = cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR)
+            source = "upload"
+        elif options.get("path"):
+            image = cv2.imread(options["path"])
+            source = options["path"]
+        else:
+            raise ValueError("Provide the image bytes as the request body or a 'path'")
+        if image is None:
+            raise ValueError(f"Failed to read image: {source}")
+        options["source"] = source
+        return options, image
+
+    def _annotate(self, url):
+        try:
+            options, image = self._read_request(url)
+            model_path = self.server.registry.resolve(options.get("model"))
+            conf = float(options.get("conf", 0.25))
+            if not 0.0 <= conf <= 1.0: # Also rejects NaN
+                raise ValueError(f"'conf' must be between 0 and 1, got {options.get('conf')}")
+            fmt = options.get("format", "yolo")
+            if fmt not in ("yolo", "json"):
+                raise ValueError(f"Unsupported format: {fmt}")
+            selected = options.get("classes")
+            # Same semantics as run_auto_annotation: None means all classes, [] means none
+            key = (model_path, conf, None if selected is None else tuple(selected))
+        except (ValueError, TypeError, FileNotFoundError) as e:
+            self._error(400, str(e))
+            return
+
+        try:
+            job = self.server.batcher.submit(key, image)
+        except queue.Full:
+            self._error(503, "Annotation queue is full, retry later")
+            return
+        if not job.done.wait(self.server.request_timeout):
+            job.cancelled = True
+            self._error(504, "Timed out waiting for inference")
+            return
+        if job.error:
+            self._error(500, job.error)
+            return
+
+        all_class_names = self.server.registry.get_classes(model_path)
+        class_names = all_class_names if selected is None else [n for n in all_class_names if n in set(selected)]
+        if fmt == "yolo":
+            text = "".join(format_yolo_line(*box[:5]) for box in job.boxes)
+            self._send(200, text, content_type="text/plain")
+            return
+        h, w = image.shape[:2]
+        self._send(200, {
+            "source": options["source"],
+            "width": w,
+            "height": h,
+            "classes": class_names,
+            "boxes": [
+                {
+                    "class_id": cls_id,
+                    "class_name": class_names[cls_id],
+                    "confidence": round(box_conf, 6),
+                    "xywhn": [round(v, 6) for v in (x_center, y_center, box_w, box_h)],
+                }
+                for cls_id, x_center, y_center, box_w, box_h, box_conf in job.boxes
+            ],
+        })
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local YOLO annotation server with dynamic request batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--model-dir", default="models", help="Directory that model names are resolved against")
+    parser.add_argument("--preload", nargs="*", default=[], help="Models to load at startup")
+    parser.add_argument("--max-batch", type=int, default=8, help="Maximum images per inference call")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="Maximum time a request waits for its batch to fill")
+    parser.add_argument("--max-pending", type=int, default=256, help="Queued images before requests are rejected with 503")
+    parser.add_argument("--max-concurrent", type=int, default=32, help="Concurrent /annotate requests before rejecting with 503")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds a request waits for its result")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.model_dir)
+    for name in args.preload:
+        model_path = registry.resolve(name)
+        registry.get_classes(model_path)
+        registry.get_model(model_path)
+    batcher = MicroBatcher(registry, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000.0,
+                           max_pending=args.max_pending)
+    server = AnnotationServer((args.host, args.port), registry, batcher,
+                              max_concurrent=args.max_concurrent, request_timeout=args.timeout)
+    print(f"✅ Annotation server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        batcher.stop()
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
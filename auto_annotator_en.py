@@ -2,6 +2,7 @@
 import os
 import cv2
 from ultralytics import YOLO
+from label_index_en import LabelIndex
 
 def get_classes(model_path):
     """Extract class names from a .pt model, always returning a list[str]"""
@@ -36,7 +37,32 @@ def get_classes(model_path):
             print(f"[ERROR] Failed to convert classes to list: {e}, using defaults")
             return ["class_0", "class_1"]
 
-def run_auto_annotation(model_path, image_dir, label_dir, conf_threshold=0.25, selected_classes=None):
+def build_class_mapping(all_class_names, filtered_class_names):
+    """Map model class IDs to the new, contiguous IDs of the selected classes"""
+    return {all_class_names.index(cls_name): new_id for new_id, cls_name in enumerate(filtered_class_names)}
+
+def format_yolo_line(cls_id, x_center, y_center, box_w, box_h):
+    """Format one normalized box as a YOLO label line"""
+    return f"{cls_id} {x_center:.6f} {y_center:.6f} {box_w:.6f} {box_h:.6f}\n"
+
+def extract_boxes(result, old_id_to_new_id, all_class_names=None):
+    """Return [(new_cls_id, x_center, y_center, w, h, conf), ...] for the selected classes of one result
+
+    If all_class_names is given, skipped (unselected) classes are logged.
+    """
+    boxes = []
+    for box in result.boxes:
+        old_cls_id = int(box.cls.item())
+        if old_cls_id not in old_id_to_new_id:
+            if all_class_names is not None:
+                cls_name = all_class_names[old_cls_id] if old_cls_id < len(all_class_names) else "unknown"
+                print(f"[DEBUG] Skipping unselected class: ID={old_cls_id}, Name='{cls_name}'")
+            continue
+        x_center, y_center, box_w, box_h = box.xywhn[0].tolist()
+        boxes.append((old_id_to_new_id[old_cls_id], x_center, y_center, box_w, box_h, float(box.conf.item())))
+    return boxes
+
+def run_auto_annotation(model_path, image_dir, label_dir, conf_threshold=0.25, selected_classes=None, build_index=True):
     print(f"[TRACE] auto_annotator.py → Received selected_classes = {selected_classes}")
     print(f"[TRACE] Type: {type(selected_classes)}")
 
@@ -64,11 +90,9 @@ def run_auto_annotation(model_path, image_dir, label_dir, conf_threshold=0.25, s
         filtered_class_names = []
 
     # Build mapping from old_id to new_id
-    old_id_to_new_id = {}
-    for new_id, cls_name in enumerate(filtered_class_names):
-        old_id = all_class_names.index(cls_name)
-        old_id_to_new_id[old_id] = new_id
-        print(f"[TRACE] Mapping: Old ID={old_id}({cls_name}) → New ID={new_id}")
+    old_id_to_new_id = build_class_mapping(all_class_names, filtered_class_names)
+    for old_id, new_id in old_id_to_new_id.items():
+        print(f"[TRACE] Mapping: Old ID={old_id}({all_class_names[old_id]}) → New ID={new_id}")
 
     # Write classes.txt
     classes_file = os.path.join(label_dir, 'classes.txt')
@@ -77,6 +101,19 @@ def run_auto_annotation(model_path, image_dir, label_dir, conf_threshold=0.25, s
             f.write(f"{cls}\n")
     print(f"[TRACE] Written to classes.txt: {classes_file}")
 
+    # Keep the label index in sync with the files written below
+    index = LabelIndex(label_dir) if build_index else None
+    if index is not None:
+        index.set_classes(filtered_class_names)
+
+    try:
+        yield from _annotate_images(model, image_dir, label_dir, image_files, conf_threshold,
+                                    all_class_names, old_id_to_new_id, index)
+    finally:
+        if index is not None:
+            index.close()
+
+def _annotate_images(model, image_dir, label_dir, image_files, conf_threshold, all_class_names, old_id_to_new_id, index):
     total_images = len(image_files)
     processed = 0
     for img_name in image_files:
@@ -89,16 +126,15 @@ def run_auto_annotation(model_path, image_dir, label_dir, conf_threshold=0.25, s
         label_path = os.path.splitext(img_name)[0] + '.txt'
         full_label_path = os.path.join(label_dir, label_path)
 
+        boxes = extract_boxes(results[0], old_id_to_new_id, all_class_names)
         with open(full_label_path, 'w') as f:
-            for box in results[0].boxes:
-                old_cls_id = int(box.cls.item())
-                if old_cls_id not in old_id_to_new_id:
-                    cls_name = all_class_names[old_cls_id] if old_cls_id < len(all_class_names) else "unknown"
-                    print(f"[DEBUG] Skipping unselected class: ID={old_cls_id}, Name='{cls_name}'")
-                    continue
-                new_cls_id = old_id_to_new_id[old_cls_id]
-                x_center, y_center, box_w, box_h = box.xywhn[0].tolist()
-                f.write(f"{new_cls_id} {x_center:.6f} {y_center:.6f} {box_w:.6f} {box_h:.6f}\n")
+            for box in boxes:
+                f.write(format_yolo_line(*box[:5]))
+
+        if index is not None:
+            h, w = image.shape[:2]
+            index.update_image(os.path.splitext(img_name)[0], w, h, boxes,
+                               label_mtime_ns=os.stat(full_label_path).st_mtime_ns)
 
         processed += 1
         yield processed, total_images
@@ -0,0 +1,305 @@
+# gallery_en.py
+"""Virtualized thumbnail gallery.
+
+Only visible cells are requested: QListView asks the model for the visible rows,
+the model loads their thumbnails in a QThreadPool, and finished thumbnails are kept
+in a bounded LRU. Thumbnails are persisted on disk keyed by path + mtime + size, so
+re-opening a large folder only decodes images that changed. The disk cache is capped
+at MAX_CACHE_BYTES and pruned least-recently-used first whenever a gallery opens.
+"""
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+import cv2
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QListView, QPushButton, QMessageBox
+from PyQt5.QtCore import Qt, QSize, QAbstractListModel, QModelIndex, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QPixmap, QImage, QPainter, QPen, QColor
+from label_index_en import parse_label_line
+
+THUMB_SIZE = 160
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "YoloAutoLabel", "thumbnails")
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+BOX_COLORS = ["#e53e3e", "#38a169", "#3182ce", "#d69e2e", "#805ad5", "#dd6b20", "#319795", "#d53f8c"]
+
+class ThumbnailCache:
+    """On-disk JPEG thumbnail cache keyed by image path, mtime and size"""
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, thumb_size=THUMB_SIZE, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.thumb_size = thumb_size
+        self.max_bytes = max_bytes
+
+    def cache_path(self, img_path):
+        st = os.stat(img_path)
+        key = f"{os.path.abspath(img_path)}|{st.st_mtime_ns}|{st.st_size}|{self.thumb_size}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + ".jpg")
+
+    def load(self, img_path):
+        """Return a BGR thumbnail for img_path, generating and storing it on a cache miss"""
+        cached = self.cache_path(img_path)
+        if os.path.isfile(cached):
+            thumb = cv2.imread(cached)
+            if thumb is not None:
+                os.utime(cached) # Mark as recently used for prune()
+                return thumb
+
+        image = cv2.imread(img_path)
+        if image is None:
+            return None
+        h, w = image.shape[:2]
+        scale = self.thumb_size / max(h, w)
+        if scale < 1:
+            image = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".jpg", dir=os.path.dirname(cached))
+        os.close(fd)
+        try:
+            if cv2.imwrite(tmp_path, image, [cv2.IMWRITE_JPEG_QUALITY, 85]):
+                os.replace(tmp_path, cached)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return image
+
+    def prune(self):
+        """Delete the least recently used thumbnails until the cache fits in max_bytes; returns bytes freed"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        freed = 0
+        for _, size, path in sorted(entries):
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                freed += size
+            except OSError:
+                continue
+        return freed
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+def read_label_boxes(label_path):
+    """Parse a YOLO label file into [(cls_id, x_center, y_center, w, h), ...]; missing file → []"""
+    if not label_path or not os.path.isfile(label_path):
+        return []
+    with open(label_path, 'r', encoding='utf-8', errors='replace') as f:
+        return [box[:5] for box in map(parse_label_line, f) if box is not None]
+
+class _ThumbnailSignals(QObject):
+    ready = pyqtSignal(int, str, QImage, object) # row, image path, thumbnail, label boxes
+
+class _ThumbnailTask(QRunnable):
+    def __init__(self, row, img_path, label_path, cache, signals, lock):
+        super().__init__()
+        self.row = row
+        self.img_path = img_path
+        self.label_path = label_path
+        self.cache = cache
+        self.signals = signals
+        self.lock = lock # Shared with GalleryModel; guards started/cancelled
+        self.started = False
+        self.cancelled = False
+        self.stale = False # Result predates a label reload and must not be cached
+
+    def run(self):
+        with self.lock:
+            if self.cancelled:
+                return
+            self.started = True
+        try:
+            thumb = self.cache.load(self.img_path)
+            boxes = read_label_boxes(self.label_path)
+        except Exception as e:
+            print(f"[ERROR] Thumbnail failed for {self.img_path}: {e}")
+            thumb, boxes = None, []
+        if thumb is None:
+            q_img = QImage()
+        else:
+            h, w, ch = thumb.shape
+            q_img = QImage(thumb.data, w, h, ch * w, QImage.Format_BGR888).copy()
+        self.signals.ready.emit(self.row, self.img_path, q_img, boxes)
+
+class GalleryModel(QAbstractListModel):
+    """List model that loads thumbnails lazily, only for rows the view asks about"""
+    def __init__(self, img_dir, image_files, label_dir="", cache=None, max_cached=600, parent=None):
+        super().__init__(parent)
+        self.img_dir = img_dir
+        self.image_files = image_files
+        self.label_dir = label_dir
+        self.cache = cache or ThumbnailCache()
+        self.max_cached = max_cached
+        self._pixmaps = OrderedDict() # row -> QPixmap, bounded LRU
+        self._pending = {} # row -> _ThumbnailTask, queued or running
+        self._pending_lock = threading.Lock()
+        self._pool = QThreadPool()
+        self._pool.setMaxThreadCount(max(2, QThreadPool.globalInstance().maxThreadCount() - 1))
+        self._signals = _ThumbnailSignals()
+        self._signals.ready.connect(self._on_thumbnail_ready)
+        self._placeholder = QPixmap(self.cache.thumb_size, self.cache.thumb_size)
+        self._placeholder.fill(QColor("#e2e8f0"))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.image_files)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return self.image_files[row]
+        if role == Qt.ToolTipRole:
+            return os.path.join(self.img_dir, self.image_files[row])
+        if role == Qt.DecorationRole:
+            pixmap = self._pixmaps.get(row)
+            if pixmap is not None:
+                self._pixmaps.move_to_end(row)
+                return pixmap
+            self._request(row)
+            return self._placeholder
+        return None
+
+    def image_path(self, row):
+        return os.path.join(self.img_dir, self.image_files[row])
+
+    def label_path(self, row):
+        if not self.label_dir:
+            return ""
+        return os.path.join(self.label_dir, os.path.splitext(self.image_files[row])[0] + '.txt')
+
+    def _request(self, row):
+        if row in self._pending:
+            return
+        task = _ThumbnailTask(row, self.image_path(row), self.label_path(row), self.cache, self._signals,
+                              self._pending_lock)
+        self._pending[row] = task
+        self._pool.start(task)
+
+    def cancel_pending(self):
+        """Drop queued thumbnail jobs (e.g. rows scrolled out of view); visible rows are re-requested on repaint.
+
+        Jobs that are already running are left to finish and stay pending, so they aren't queued twice.
+        """
+        self._pool.clear()
+        with self._pending_lock:
+            for row, task in list(self._pending.items()):
+                if not task.started:
+                    task.cancelled = True
+                    del self._pending[row]
+
+    def refresh_labels(self):
+        """Forget composed thumbnails so overlays are redrawn from the current label files"""
+        self.cancel_pending()
+        for task in self._pending.values():
+            task.stale = True
+        self._pixmaps.clear()
+        if self.image_files:
+            self.dataChanged.emit(self.index(0), self.index(len(self.image_files) - 1), [Qt.DecorationRole])
+
+    def clear_cache(self):
+        """Delete the on-disk thumbnail cache and regenerate the visible thumbnails"""
+        self.cancel_pending()
+        self.cache.clear()
+        self.refresh_labels()
+
+    def shutdown(self):
+        self.cancel_pending()
+        self._pool.waitForDone()
+
+    def _on_thumbnail_ready(self, row, img_path, q_img, boxes):
+        task = self._pending.pop(row, None)
+        if row >= len(self.image_files) or self.image_path(row) != img_path:
+            return
+        if task is not None and task.stale:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole]) # Re-requested with the current labels
+            return
+        if q_img.isNull():
+            pixmap = QPixmap(self._placeholder)
+            pixmap.fill(QColor("#fed7d7"))
+        else:
+            pixmap = QPixmap.fromImage(q_img)
+            self._draw_boxes(pixmap, boxes)
+        self._pixmaps[row] = pixmap
+        while len(self._pixmaps) > self.max_cached:
+            self._pixmaps.popitem(last=False)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    @staticmethod
+    def _draw_boxes(pixmap, boxes):
+        if not boxes:
+            return
+        w, h = pixmap.width(), pixmap.height()
+        painter = QPainter(pixmap)
+        for cls_id, x_center, y_center, box_w, box_h in boxes:
+            painter.setPen(QPen(QColor(BOX_COLORS[cls_id % len(BOX_COLORS)]), 2))
+            painter.drawRect(int((x_center - box_w / 2) * w), int((y_center - box_h / 2) * h),
+                             int(box_w * w), int(box_h * h))
+        painter.end()
+
+class GalleryDialog(QDialog):
+    """Grid of thumbnails with label overlays; emits image_activated(image path) on double-click"""
+    image_activated = pyqtSignal(str)
+
+    def __init__(self, img_dir, image_files, label_dir="", parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Gallery - {len(image_files)} images")
+        self.resize(1100, 750)
+        self.model = GalleryModel(img_dir, image_files, label_dir, parent=self)
+
+        self.view = QListView()
+        self.view.setViewMode(QListView.IconMode)
+        self.view.setMovement(QListView.Static)
+        self.view.setResizeMode(QListView.Adjust)
+        self.view.setUniformItemSizes(True)
+        self.view.setLayoutMode(QListView.Batched)
+        self.view.setBatchSize(500)
+        self.view.setIconSize(QSize(THUMB_SIZE, THUMB_SIZE))
+        self.view.setGridSize(QSize(THUMB_SIZE + 20, THUMB_SIZE + 36))
+        self.view.setModel(self.model)
+        self.view.verticalScrollBar().valueChanged.connect(self.model.cancel_pending)
+        self.view.doubleClicked.connect(lambda index: self.image_activated.emit(self.model.image_path(index.row())))
+
+        self.info_label = QLabel(f"{len(image_files)} images · double-click to open in preview")
+        self.refresh_btn = QPushButton("🔄 Reload Labels")
+        self.refresh_btn.clicked.connect(self.model.refresh_labels)
+        self.clear_cache_btn = QPushButton("🗑 Clear Thumbnail Cache")
+        self.clear_cache_btn.clicked.connect(self.clear_cache)
+        top_row = QHBoxLayout()
+        top_row.addWidget(self.info_label)
+        top_row.addStretch()
+        top_row.addWidget(self.refresh_btn)
+        top_row.addWidget(self.clear_cache_btn)
+
+        layout = QVBoxLayout()
+        layout.addLayout(top_row)
+        layout.addWidget(self.view, 1)
+        self.setLayout(layout)
+        self.finished.connect(self.model.shutdown)
+        # Keep the disk cache bounded; orphaned thumbnails of edited images are evicted first
+        threading.Thread(target=self.model.cache.prune, daemon=True).start()
+
+    def clear_cache(self):
+        reply = QMessageBox.question(self, "Clear Thumbnail Cache",
+                                     f"Delete all cached thumbnails in {self.model.cache.cache_dir}?")
+        if reply == QMessageBox.Yes:
+            self.model.clear_cache()
+
+    def scroll_to(self, row):
+        index = self.model.index(row)
+        self.view.setCurrentIndex(index)
+        self.view.scrollTo(index, QListView.PositionAtCenter)
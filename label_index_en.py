@@ -0,0 +1,321 @@
+# label_index_en.py
+"""SQLite index of every box written to a label directory.
+
+run_auto_annotation keeps the index up to date as it writes label files, so
+per-class counts, box size distributions and QA queries (empty images, crowded
+images, low-confidence boxes) don't need to re-read every .txt file.
+Label files written by other tools can be picked up with sync_label_dir().
+
+Usage: python label_index_en.py LABEL_DIR {summary,classes,sizes,empty,crowded,lowconf} [options]
+"""
+import os
+import sys
+import math
+import time
+import sqlite3
+import argparse
+
+INDEX_FILENAME = "labels_index.sqlite"
+SIZE_BINS = 20 # Resolution of the maintained box size histogram
+SYNC_COMMIT_EVERY = 200 # Label files per transaction in sync_label_dir()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    width INTEGER,
+    height INTEGER,
+    label_mtime_ns INTEGER,
+    num_boxes INTEGER NOT NULL DEFAULT 0,
+    min_conf REAL
+);
+CREATE TABLE IF NOT EXISTS boxes (
+    image_id INTEGER NOT NULL,
+    class_id INTEGER NOT NULL,
+    x_center REAL NOT NULL,
+    y_center REAL NOT NULL,
+    width REAL NOT NULL,
+    height REAL NOT NULL,
+    size REAL NOT NULL, -- sqrt(width * height), precomputed for size histograms
+    conf REAL
+);
+CREATE TABLE IF NOT EXISTS classes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+-- Aggregates maintained on every write so class and size queries don't scan boxes
+CREATE TABLE IF NOT EXISTS class_stats (
+    class_id INTEGER PRIMARY KEY,
+    boxes INTEGER NOT NULL,
+    images INTEGER NOT NULL,
+    conf_sum REAL NOT NULL,
+    conf_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS size_hist (
+    class_id INTEGER NOT NULL,
+    bin INTEGER NOT NULL,
+    boxes INTEGER NOT NULL,
+    PRIMARY KEY (class_id, bin)
+);
+CREATE INDEX IF NOT EXISTS idx_boxes_image ON boxes(image_id);
+CREATE INDEX IF NOT EXISTS idx_boxes_class ON boxes(class_id);
+CREATE INDEX IF NOT EXISTS idx_boxes_conf ON boxes(conf);
+CREATE INDEX IF NOT EXISTS idx_images_num_boxes ON images(num_boxes);
+CREATE INDEX IF NOT EXISTS idx_images_min_conf ON images(min_conf);
+"""
+
+def index_path(label_dir):
+    return os.path.join(label_dir, INDEX_FILENAME)
+
+def parse_label_line(line):
+    """Parse 'cls x y w h [conf]' into (cls, x, y, w, h, conf); None for anything else (e.g. polygons)"""
+    parts = line.split()
+    if len(parts) not in (5, 6):
+        return None
+    try:
+        cls_id = int(parts[0])
+        values = [float(v) for v in parts[1:]]
+    except ValueError:
+        return None
+    if cls_id < 0 or not all(math.isfinite(v) for v in values):
+        return None
+    x_center, y_center, box_w, box_h = values[:4]
+    if box_w < 0 or box_h < 0:
+        return None
+    conf = values[4] if len(values) == 5 else None
+    return cls_id, x_center, y_center, box_w, box_h, conf
+
+class LabelIndex:
+    """Incrementally updated index of the labels in one label directory.
+
+    By default every write is committed immediately, so a long annotation run never
+    holds the write lock between images and readers (e.g. the stats panel) can sync.
+    """
+    def __init__(self, label_dir, commit_every=1):
+        self.label_dir = label_dir
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self.conn = sqlite3.connect(index_path(label_dir), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    # --- Writing ---
+
+    def set_classes(self, class_names):
+        """Replace the class table with the contents of classes.txt"""
+        self.conn.execute("DELETE FROM classes")
+        self.conn.executemany("INSERT INTO classes (id, name) VALUES (?, ?)", list(enumerate(class_names)))
+        self._written()
+
+    def update_image(self, name, width, height, boxes, label_mtime_ns=None):
+        """Replace the indexed boxes of one image.
+
+        boxes: [(class_id, x_center, y_center, w, h, conf), ...]; conf may be None.
+        """
+        confs = [b[5] for b in boxes if b[5] is not None]
+        min_conf = min(confs) if confs else None
+        row = self.conn.execute("SELECT id FROM images WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            cur = self.conn.execute(
+                "INSERT INTO images (name, width, height, label_mtime_ns, num_boxes, min_conf) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, width, height, label_mtime_ns, len(boxes), min_conf))
+            image_id = cur.lastrowid
+        else:
+            image_id = row[0]
+            self.conn.execute(
+                "UPDATE images SET width = ?, height = ?, label_mtime_ns = ?, num_boxes = ?, min_conf = ? WHERE id = ?",
+                (width, height, label_mtime_ns, len(boxes), min_conf, image_id))
+            self._delete_boxes(image_id)
+        rows = [(image_id, *box[:5], (max(box[3], 0.0) * max(box[4], 0.0)) ** 0.5, box[5]) for box in boxes]
+        self.conn.executemany(
+            "INSERT INTO boxes (image_id, class_id, x_center, y_center, width, height, size, conf) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows)
+        self._update_stats([(r[1], r[6], r[7]) for r in rows], +1)
+        self._written()
+
+    def remove_image(self, name):
+        row = self.conn.execute("SELECT id FROM images WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            self._delete_boxes(row[0])
+            self.conn.execute("DELETE FROM images WHERE id = ?", (row[0],))
+            self._written()
+
+    def _delete_boxes(self, image_id):
+        old = self.conn.execute("SELECT class_id, size, conf FROM boxes WHERE image_id = ?", (image_id,)).fetchall()
+        self._update_stats(old, -1)
+        self.conn.execute("DELETE FROM boxes WHERE image_id = ?", (image_id,))
+
+    def _update_stats(self, boxes, sign):
+        """Add (sign=+1) or subtract (sign=-1) one image's [(class_id, size, conf), ...] to the aggregates"""
+        per_class = {}
+        per_bin = {}
+        for class_id, size, conf in boxes:
+            stats = per_class.setdefault(class_id, [0, 0.0, 0])
+            stats[0] += 1
+            if conf is not None:
+                stats[1] += conf
+                stats[2] += 1
+            key = (class_id, min(int(size * SIZE_BINS), SIZE_BINS - 1))
+            per_bin[key] = per_bin.get(key, 0) + 1
+        self.conn.executemany("""
+            INSERT INTO class_stats (class_id, boxes, images, conf_sum, conf_count) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(class_id) DO UPDATE SET boxes = boxes + excluded.boxes, images = images + excluded.images,
+                conf_sum = conf_sum + excluded.conf_sum, conf_count = conf_count + excluded.conf_count
+        """, [(c, sign * n, sign, sign * conf_sum, sign * conf_n) for c, (n, conf_sum, conf_n) in per_class.items()])
+        self.conn.executemany("""
+            INSERT INTO size_hist (class_id, bin, boxes) VALUES (?, ?, ?)
+            ON CONFLICT(class_id, bin) DO UPDATE SET boxes = boxes + excluded.boxes
+        """, [(c, b, sign * n) for (c, b), n in per_bin.items()])
+
+    def _written(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def sync_label_dir(self):
+        """Index label files that are new or changed since they were last indexed, and drop deleted ones.
+
+        Boxes read back from label files carry no confidence unless a sixth column holds one;
+        lines that aren't boxes (polygons, malformed lines) are skipped. Returns the number of
+        re-indexed files.
+        """
+        commit_every, self.commit_every = self.commit_every, max(self.commit_every, SYNC_COMMIT_EVERY)
+        try:
+            classes_file = os.path.join(self.label_dir, 'classes.txt')
+            if os.path.isfile(classes_file):
+                with open(classes_file, 'r', encoding='utf-8') as f:
+                    self.set_classes([line.strip() for line in f if line.strip()])
+
+            known = dict(self.conn.execute("SELECT name, label_mtime_ns FROM images"))
+            seen = set()
+            updated = 0
+            for entry in os.scandir(self.label_dir):
+                if not entry.name.endswith('.txt') or entry.name == 'classes.txt':
+                    continue
+                stem = entry.name[:-4]
+                seen.add(stem)
+                mtime_ns = entry.stat().st_mtime_ns
+                if known.get(stem) == mtime_ns:
+                    continue
+                with open(entry.path, 'r', encoding='utf-8', errors='replace') as f:
+                    boxes = [box for box in map(parse_label_line, f) if box is not None]
+                self.update_image(stem, None, None, boxes, label_mtime_ns=mtime_ns)
+                updated += 1
+            for stem in set(known) - seen:
+                self.remove_image(stem)
+            self.commit()
+        except Exception:
+            self.conn.rollback()
+            self._uncommitted = 0
+            raise
+        finally:
+            self.commit_every = commit_every
+        return updated
+
+    # --- Queries ---
+
+    def summary(self):
+        images, boxes, empty = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(num_boxes), 0), COALESCE(SUM(num_boxes = 0), 0) FROM images").fetchone()
+        return {"images": images, "boxes": boxes, "empty_images": empty,
+                "avg_boxes_per_image": boxes / images if images else 0.0}
+
+    def class_counts(self):
+        """[(class_id, class_name, boxes, images, mean_conf), ...] sorted by class ID"""
+        return self.conn.execute("""
+            SELECT s.class_id, COALESCE(c.name, 'class_' || s.class_id), s.boxes, s.images,
+                   CASE WHEN s.conf_count > 0 THEN s.conf_sum / s.conf_count END
+            FROM class_stats s LEFT JOIN classes c ON c.id = s.class_id
+            WHERE s.boxes > 0 ORDER BY s.class_id
+        """).fetchall()
+
+    def box_size_histogram(self, class_id=None):
+        """Histogram of sqrt(w * h) (relative box side, 0..1) in SIZE_BINS bins: [(bin_start, bin_end, count), ...]"""
+        where, params = ("WHERE class_id = ?", [class_id]) if class_id is not None else ("", [])
+        counts = dict(self.conn.execute(
+            f"SELECT bin, SUM(boxes) FROM size_hist {where} GROUP BY bin", params).fetchall())
+        return [(i / SIZE_BINS, (i + 1) / SIZE_BINS, counts.get(i, 0)) for i in range(SIZE_BINS)]
+
+    def empty_images(self, limit=1000):
+        return [r[0] for r in self.conn.execute(
+            "SELECT name FROM images WHERE num_boxes = 0 ORDER BY name LIMIT ?", (limit,))]
+
+    def crowded_images(self, min_boxes=20, limit=1000):
+        """[(name, num_boxes), ...] with at least min_boxes boxes, most crowded first"""
+        return self.conn.execute(
+            "SELECT name, num_boxes FROM images WHERE num_boxes >= ? ORDER BY num_boxes DESC LIMIT ?",
+            (min_boxes, limit)).fetchall()
+
+    def low_confidence_images(self, threshold=0.4, limit=1000):
+        """[(name, low_conf_boxes, min_conf), ...] for images with any box below threshold, lowest first"""
+        # Walk idx_images_min_conf in order and count per image, so LIMIT stops the scan early
+        return self.conn.execute("""
+            SELECT i.name, (SELECT COUNT(*) FROM boxes b WHERE b.image_id = i.id AND b.conf < ?), i.min_conf
+            FROM images i
+            WHERE i.min_conf < ?
+            ORDER BY i.min_conf LIMIT ?
+        """, (threshold, threshold, limit)).fetchall()
+
+def _print_rows(headers, rows):
+    print("\t".join(headers))
+    for row in rows:
+        print("\t".join(f"{v:.4f}" if isinstance(v, float) else str(v) for v in row))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the label index of a label directory")
+    parser.add_argument("label_dir")
+    parser.add_argument("--sync", action="store_true", help="Index new or changed label files first")
+    sub = parser.add_subparsers(dest="query", required=True)
+    sub.add_parser("summary")
+    sub.add_parser("classes")
+    sizes = sub.add_parser("sizes")
+    sizes.add_argument("--class-id", type=int)
+    empty = sub.add_parser("empty")
+    empty.add_argument("--limit", type=int, default=1000)
+    crowded = sub.add_parser("crowded")
+    crowded.add_argument("--min-boxes", type=int, default=20)
+    crowded.add_argument("--limit", type=int, default=1000)
+    lowconf = sub.add_parser("lowconf")
+    lowconf.add_argument("--threshold", type=float, default=0.4)
+    lowconf.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    # Only run_auto_annotation creates indexes; a mistyped directory must not produce an empty one
+    if not os.path.isdir(args.label_dir):
+        parser.error(f"label directory not found: {args.label_dir}")
+    if not args.sync and not os.path.isfile(index_path(args.label_dir)):
+        parser.error(f"no {INDEX_FILENAME} in {args.label_dir}; run an annotation first or pass --sync")
+
+    index = LabelIndex(args.label_dir)
+    try:
+        if args.sync:
+            print(f"[TRACE] Re-indexed {index.sync_label_dir()} label files")
+        start = time.perf_counter()
+        if args.query == "summary":
+            _print_rows(["key", "value"], index.summary().items())
+        elif args.query == "classes":
+            _print_rows(["class_id", "class_name", "boxes", "images", "mean_conf"], index.class_counts())
+        elif args.query == "sizes":
+            _print_rows(["from", "to", "boxes"], index.box_size_histogram(args.class_id))
+        elif args.query == "empty":
+            _print_rows(["image"], [(name,) for name in index.empty_images(args.limit)])
+        elif args.query == "crowded":
+            _print_rows(["image", "boxes"], index.crowded_images(args.min_boxes, args.limit))
+        elif args.query == "lowconf":
+            _print_rows(["image", "low_conf_boxes", "min_conf"], index.low_confidence_images(args.threshold, args.limit))
+        print(f"[TRACE] Query took {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+    finally:
+        index.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
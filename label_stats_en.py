@@ -0,0 +1,183 @@
+# label_stats_en.py
+"""Query panel over the label index of a label directory (see label_index_en.py)"""
+import time
+import sqlite3
+import threading
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton, QSpinBox,
+                             QDoubleSpinBox, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox)
+from PyQt5.QtCore import Qt, pyqtSignal
+from label_index_en import LabelIndex
+
+class LabelStatsDialog(QDialog):
+    """Runs label index queries; emits image_activated(label stem) when an image row is double-clicked"""
+    image_activated = pyqtSignal(str)
+    _sync_finished = pyqtSignal(int, float) # re-indexed files, elapsed ms
+    _sync_failed = pyqtSignal(str)
+
+    ROW_LIMIT = 1000 # Rows shown for image-level queries
+
+    QUERIES = [
+        "Summary",
+        "Class Counts",
+        "Box Size Distribution",
+        "Empty-Label Images",
+        "Crowded Images",
+        "Low-Confidence Images",
+    ]
+
+    def __init__(self, label_dir, parent=None):
+        super().__init__(parent)
+        self.label_dir = label_dir
+        self.setWindowTitle(f"Label Statistics - {label_dir}")
+        self.resize(800, 600)
+        self.index = None
+        self.image_rows = False # Whether the first column of the current result holds image names
+
+        self.query_combo = QComboBox()
+        self.query_combo.addItems(self.QUERIES)
+        self.query_combo.currentIndexChanged.connect(self._update_param_visibility)
+        self.min_boxes_spin = QSpinBox()
+        self.min_boxes_spin.setRange(1, 10000)
+        self.min_boxes_spin.setValue(20)
+        self.min_boxes_spin.setPrefix("Min boxes: ")
+        self.threshold_spin = QDoubleSpinBox()
+        self.threshold_spin.setRange(0.0, 1.0)
+        self.threshold_spin.setSingleStep(0.05)
+        self.threshold_spin.setValue(0.4)
+        self.threshold_spin.setPrefix("Conf < ")
+        self.run_btn = QPushButton("▶ Run Query")
+        self.run_btn.clicked.connect(self.run_query)
+        self.sync_btn = QPushButton("🔄 Sync Label Files")
+        self.sync_btn.clicked.connect(self.sync_labels)
+
+        query_row = QHBoxLayout()
+        query_row.addWidget(self.query_combo, 1)
+        query_row.addWidget(self.min_boxes_spin)
+        query_row.addWidget(self.threshold_spin)
+        query_row.addWidget(self.run_btn)
+        query_row.addWidget(self.sync_btn)
+
+        self.table = QTableWidget()
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.cellDoubleClicked.connect(self._on_cell_double_clicked)
+        self.status_label = QLabel("")
+
+        layout = QVBoxLayout()
+        layout.addLayout(query_row)
+        layout.addWidget(self.table, 1)
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+        self._update_param_visibility()
+        self._sync_finished.connect(self._on_sync_finished)
+        self._sync_failed.connect(self._on_sync_failed)
+
+        try:
+            self.index = LabelIndex(label_dir)
+        except (sqlite3.Error, OSError) as e:
+            self._show_error("Failed to open the label index", e)
+            self.run_btn.setEnabled(False)
+            self.sync_btn.setEnabled(False)
+            return
+        self.finished.connect(self.index.close)
+        self.run_query()
+
+    def _show_error(self, title, error):
+        self.status_label.setText(f"❌ {title}: {error}")
+        QMessageBox.critical(self, "Label Index Error", f"{title}:\n{error}")
+
+    def _update_param_visibility(self):
+        query = self.query_combo.currentText()
+        self.min_boxes_spin.setVisible(query == "Crowded Images")
+        self.threshold_spin.setVisible(query == "Low-Confidence Images")
+
+    def sync_labels(self):
+        """Re-index changed label files in a worker thread with its own connection"""
+        self.run_btn.setEnabled(False)
+        self.sync_btn.setEnabled(False)
+        self.setCursor(Qt.BusyCursor)
+        self.status_label.setText("🔄 Syncing label files...")
+
+        def run_sync():
+            start = time.perf_counter()
+            try:
+                index = LabelIndex(self.label_dir)
+                try:
+                    updated = index.sync_label_dir()
+                finally:
+                    index.close()
+            except (sqlite3.Error, OSError) as e:
+                self._emit_from_worker("_sync_failed", str(e))
+                return
+            self._emit_from_worker("_sync_finished", updated, (time.perf_counter() - start) * 1000)
+
+        threading.Thread(target=run_sync, daemon=True).start()
+
+    def _emit_from_worker(self, signal_name, *args):
+        try:
+            getattr(self, signal_name).emit(*args)
+        except RuntimeError:
+            pass # Dialog was closed and deleted while the worker ran
+
+    def _on_sync_finished(self, updated, elapsed_ms):
+        self._end_sync()
+        self.run_query()
+        self.status_label.setText(f"🔄 Re-indexed {updated} label files in {elapsed_ms:.0f} ms · {self.status_label.text()}")
+
+    def _on_sync_failed(self, msg):
+        self._end_sync()
+        self._show_error("Failed to sync label files", msg)
+
+    def _end_sync(self):
+        self.unsetCursor()
+        self.run_btn.setEnabled(True)
+        self.sync_btn.setEnabled(True)
+
+    def run_query(self):
+        query = self.query_combo.currentText()
+        start = time.perf_counter()
+        try:
+            headers, rows = self._query(query)
+        except sqlite3.Error as e:
+            self._show_error("Query failed", e)
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.image_rows = query in ("Empty-Label Images", "Crowded Images", "Low-Confidence Images")
+        truncated = len(rows) > self.ROW_LIMIT
+        rows = rows[:self.ROW_LIMIT]
+
+        self.table.clear()
+        self.table.setColumnCount(len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, value in enumerate(row):
+                text = "-" if value is None else f"{value:.4f}" if isinstance(value, float) else str(value)
+                self.table.setItem(r, c, QTableWidgetItem(text))
+        hint = " · double-click to open in preview" if self.image_rows and rows else ""
+        shown = f"first {len(rows)} rows (more match)" if truncated else f"{len(rows)} rows"
+        self.status_label.setText(f"{shown} in {elapsed_ms:.1f} ms{hint}")
+
+    def _query(self, query):
+        """Return (headers, rows) for the named query; image queries fetch one extra row to detect truncation"""
+        limit = self.ROW_LIMIT + 1
+        if query == "Summary":
+            headers, rows = ["Metric", "Value"], list(self.index.summary().items())
+        elif query == "Class Counts":
+            headers, rows = ["Class ID", "Class", "Boxes", "Images", "Mean Conf"], self.index.class_counts()
+        elif query == "Box Size Distribution":
+            headers = ["Size From", "Size To", "Boxes"]
+            rows = self.index.box_size_histogram()
+        elif query == "Empty-Label Images":
+            headers, rows = ["Image"], [(name,) for name in self.index.empty_images(limit)]
+        elif query == "Crowded Images":
+            headers, rows = ["Image", "Boxes"], self.index.crowded_images(self.min_boxes_spin.value(), limit)
+        else:
+            headers = ["Image", "Low-Conf Boxes", "Min Conf"]
+            rows = self.index.low_confidence_images(self.threshold_spin.value(), limit)
+        return headers, rows
+
+    def _on_cell_double_clicked(self, row, column):
+        if self.image_rows:
+            self.image_activated.emit(self.table.item(row, 0).text())
@@ -6,6 +6,8 @@ from PyQt5.QtCore import Qt, QMetaObject, Q_ARG, pyqtSlot, QTimer
 from PyQt5.QtGui import QPixmap, QImage
 import threading
 from auto_annotator_en import run_auto_annotation, preview_detection, get_classes
+from gallery_en import GalleryDialog
+from label_stats_en import LabelStatsDialog
 
 class AutoLabelTool(QMainWindow):
     def __init__(self):
@@ -19,6 +21,8 @@ class AutoLabelTool(QMainWindow):
         self.img_dir = "" # Path to current image directory
         self.selected_classes = [] # List of user-selected class names
         self.all_model_classes = [] # All class names from the current model
+        self.gallery_dialog = None # Open thumbnail gallery, if any
+        self.stats_dialog = None # Open label statistics panel, if any
         self.init_ui()
         self.preview_debounce_timer = QTimer()
         self.preview_debounce_timer.setSingleShot(True)
@@ -164,9 +168,15 @@ class AutoLabelTool(QMainWindow):
         self.next_btn.clicked.connect(self.next_image)
         self.image_info_label = QLabel("No image loaded")
         self.image_info_label.setAlignment(Qt.AlignCenter)
+        self.gallery_btn = QPushButton("🖼 Gallery")
+        self.gallery_btn.clicked.connect(self.open_gallery)
+        self.stats_btn = QPushButton("📊 Label Stats")
+        self.stats_btn.clicked.connect(self.open_label_stats)
         control_layout.addWidget(self.prev_btn)
         control_layout.addWidget(self.image_info_label)
         control_layout.addWidget(self.next_btn)
+        control_layout.addWidget(self.gallery_btn)
+        control_layout.addWidget(self.stats_btn)
         right_layout.addLayout(control_layout)
 
         # === Preview Display Area ===
@@ -413,6 +423,11 @@ class AutoLabelTool(QMainWindow):
     def get_confidence(self):
         return self.conf_slider.value() / 100.0
 
+    def list_images(self, img_dir):
+        """Sorted image file names in img_dir"""
+        img_exts = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
+        return sorted(f for f in os.listdir(img_dir) if f.lower().endswith(img_exts))
+
     def load_and_preview(self):
         model_path = self.get_selected_model()
         img_dir = self.img_dir_edit.text()
@@ -423,13 +438,12 @@ class AutoLabelTool(QMainWindow):
             QMessageBox.warning(self, "Error", "Please select an image directory!")
             return
 
-        img_exts = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
-        image_files = [f for f in os.listdir(img_dir) if f.lower().endswith(img_exts)]
+        image_files = self.list_images(img_dir)
         if not image_files:
             QMessageBox.warning(self, "Info", "No valid images found in the directory!")
             return
 
-        self.image_files = sorted(image_files)
+        self.image_files = image_files
         self.img_dir = img_dir
         self.current_image_index = 0
         self.update_preview()
@@ -484,6 +498,87 @@ class AutoLabelTool(QMainWindow):
             self.current_image_index = min(len(self.image_files) - 1, self.current_image_index + 1)
             self.update_preview()
 
+    def open_gallery(self):
+        """Open a virtualized thumbnail grid of the image directory"""
+        img_dir = self.img_dir_edit.text()
+        if not self.image_files or os.path.normpath(self.img_dir) != os.path.normpath(img_dir):
+            if not img_dir or not os.path.isdir(img_dir):
+                QMessageBox.warning(self, "Error", "Please select an image directory!")
+                return
+            image_files = self.list_images(img_dir)
+            if not image_files:
+                QMessageBox.warning(self, "Info", "No valid images found in the directory!")
+                return
+            self.image_files = image_files
+            self.img_dir = img_dir
+            self.current_image_index = 0
+
+        if self.gallery_dialog is not None:
+            self.gallery_dialog.close()
+        self.gallery_dialog = GalleryDialog(self.img_dir, list(self.image_files), self.label_dir_edit.text(), parent=self)
+        self.gallery_dialog.setAttribute(Qt.WA_DeleteOnClose)
+        self.gallery_dialog.image_activated.connect(self.on_gallery_image_activated)
+        self.gallery_dialog.finished.connect(self._on_gallery_closed)
+        self.gallery_dialog.show()
+        self.gallery_dialog.scroll_to(self.current_image_index)
+        self.log_text.append(f"🖼 Gallery opened with {len(self.image_files)} images")
+
+    def on_gallery_image_activated(self, img_path):
+        """Show the double-clicked gallery image, even if another directory was loaded since the gallery opened"""
+        img_dir, name = os.path.split(img_path)
+        if os.path.normpath(self.img_dir) != os.path.normpath(img_dir) or name not in self.image_files:
+            self.image_files = self.list_images(img_dir)
+            self.img_dir = img_dir
+        if name not in self.image_files:
+            self.log_text.append(f"⚠️ Image '{img_path}' no longer exists")
+            return
+        self.show_image(self.image_files.index(name))
+
+    def show_image(self, row):
+        self.current_image_index = row
+        if self.get_selected_model():
+            self.update_preview()
+            return
+        # No model selected: show the raw image without detections
+        pixmap = QPixmap(os.path.join(self.img_dir, self.image_files[row]))
+        if pixmap.isNull():
+            self.log_text.append(f"❌ Failed to read image: {self.image_files[row]}")
+            return
+        self.current_preview_pixmap = pixmap
+        self.update_preview_display()
+        self.image_info_label.setText(f"{row + 1} / {len(self.image_files)} - {self.image_files[row]}")
+
+    def _on_gallery_closed(self):
+        self.gallery_dialog = None
+
+    def open_label_stats(self):
+        """Open the query panel over the label index of the label directory"""
+        label_dir = self.label_dir_edit.text()
+        if not label_dir or not os.path.isdir(label_dir):
+            QMessageBox.warning(self, "Error", "Please select a label output directory!")
+            return
+        if self.stats_dialog is not None:
+            self.stats_dialog.close()
+        self.stats_dialog = LabelStatsDialog(label_dir, parent=self)
+        self.stats_dialog.setAttribute(Qt.WA_DeleteOnClose)
+        self.stats_dialog.image_activated.connect(self.on_stats_image_activated)
+        self.stats_dialog.finished.connect(self._on_stats_closed)
+        self.stats_dialog.show()
+
+    def on_stats_image_activated(self, stem):
+        img_dir = self.img_dir_edit.text()
+        if not self.image_files and img_dir and os.path.isdir(img_dir):
+            self.image_files = self.list_images(img_dir)
+            self.img_dir = img_dir
+        for row, name in enumerate(self.image_files):
+            if os.path.splitext(name)[0] == stem:
+                self.show_image(row)
+                return
+        self.log_text.append(f"⚠️ Image for label '{stem}' not found in the image directory")
+
+    def _on_stats_closed(self):
+        self.stats_dialog = None
+
     def start_annotation(self):
         model_path = self.get_selected_model()
         img_dir = self.img_dir_edit.text()